@@ -53,16 +53,14 @@ def supertrend(df, period=7, atr_multiplier=2):
 
 def is_supertrend_signal(df):
     ST = supertrend(df)
-    sut_list = ST['SUPERTd_7_2']
+    # 컬럼 이름(SUPERTd_7_2 / SUPERTd_7_2.0)은 pandas-ta 버전마다 달라서 위치로 접근 (0:값, 1:방향)
+    direction = ST.iloc[:, 1].to_numpy()
 
-    first = sut_list.iloc[0]
-    for i in range(1,len(sut_list)):
-        if first == sut_list.iloc[i]:
-            sut_list.iloc[i] = 0
-        else:
-            first = sut_list.iloc[i]
+    # 방향이 바뀐 날만 남기고 나머지는 0
+    changed = direction.copy()
+    changed[1:][direction[1:] == direction[:-1]] = 0
 
-    return ST['SUPERTd_7_2'].iloc[-2] > 0 or ST['SUPERTd_7_2'].iloc[-3] > 0  
+    return changed[-2] > 0 or changed[-3] > 0  
 
 #    return ST['SUPERTd_7_2'].iloc[-2] > 0
 
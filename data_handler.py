@@ -1,6 +1,76 @@
 from pykrx import stock
 from pykrx import bond
 import pandas as pd
+import numpy as np
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+OHLCV_CACHE_DIR = os.path.join('cache', 'ohlcv')
+
+
+# 여러 스레드에서 호출해도 초당 요청 수를 전체적으로 제한하는 토큰 버킷
+class RateLimiter(object):
+    def __init__(self, calls_per_second):
+        self.rate = calls_per_second
+        self.tokens = calls_per_second
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+krx_rate_limiter = RateLimiter(10)
+
+
+# 임시 파일에 쓴 뒤 교체해서, 중간에 중단돼도 깨진 파일이 남지 않도록 함
+def write_parquet_atomic(df, path, **kwargs):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        df.to_parquet(tmp_path, **kwargs)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def is_written_today(path):
+    return datetime.fromtimestamp(os.path.getmtime(path)).date() == date.today()
+
+# 오늘 만들어지지 않은 캐시 파일은 다시 읽히지 않으므로 삭제
+def prune_stale_files(directory):
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.isfile(path) and not is_written_today(path):
+                os.remove(path)
+        except OSError as e:
+            logger.debug("%s 캐시 삭제 실패: %s", path, e)
+
+_prune_lock = threading.Lock()
+_pruned_dirs = set()
+
+def prune_stale_files_once(directory):
+    with _prune_lock:
+        if directory in _pruned_dirs:
+            return
+        _pruned_dirs.add(directory)
+    prune_stale_files(directory)
+
 
 class StockDataHandler(object):
     def __init__(self, stock_code, start_date, end_date, is_index = False):
@@ -23,16 +93,60 @@ class StockDataHandler(object):
         df.rename(columns=new_column_names, inplace=True)
         return df
 
+    # 정수 컬럼은 int32로 줄여서 메모리 사용량을 절반으로
+    # (거래대금처럼 int32 범위를 넘는 컬럼은 그대로 둠)
+    # 실수 컬럼(지수 가격, 등락률)은 float32로 줄이면 2567.89가 2567.889893처럼 바뀌므로 float64 유지
+    def downcast_columns(self, df):
+        int32_info = np.iinfo(np.int32)
+        for col in df.select_dtypes(include='integer').columns:
+            if df[col].empty or (df[col].min() >= int32_info.min and df[col].max() <= int32_info.max):
+                df[col] = df[col].astype(np.int32)
+        return df
+
+    # 같은 (종목, 기간) 데이터는 당일 저장한 parquet 캐시에서 읽음
+    def get_cache_path(self):
+        prefix = 'index_' if self.is_index else ''
+        return os.path.join(OHLCV_CACHE_DIR, f"{prefix}{self.stock_code}_{self.start_date}_{self.end_date}.parquet")
+
+    def load_cache(self):
+        path = self.get_cache_path()
+        try:
+            if not os.path.exists(path) or not is_written_today(path):
+                return False
+            self.daily_data = pd.read_parquet(path)
+            return True
+        except Exception as e:
+            # 깨진 캐시 파일은 없는 것으로 보고 다시 받음
+            logger.debug("%s 캐시 읽기 실패: %s", path, e)
+            return False
+
+    def save_cache(self):
+        if self.daily_data.empty:
+            return
+        try:
+            os.makedirs(OHLCV_CACHE_DIR, exist_ok=True)
+            prune_stale_files_once(OHLCV_CACHE_DIR)
+            write_parquet_atomic(self.daily_data, self.get_cache_path(), compression='zstd')
+        except Exception as e:
+            # 캐시 저장에 실패해도 받은 데이터는 그대로 사용
+            logger.warning("%s 캐시 저장 실패: %s", self.stock_code, e)
+
     def get_data(self):
+        if self.load_cache():
+            return
+        krx_rate_limiter.acquire()
         try:
             if self.is_index :
                 df = stock.get_index_ohlcv(self.start_date, self.end_date, self.stock_code)
-                self.daily_data = self.rename_stock_column(df)
+                self.daily_data = self.downcast_columns(self.rename_stock_column(df))
             else:
                 df = stock.get_market_ohlcv_by_date(self.start_date, self.end_date, self.stock_code)
-                self.daily_data = self.rename_stock_column(df)
-        except:
+                self.daily_data = self.downcast_columns(self.rename_stock_column(df))
+        except Exception as e:
+            logger.debug("%s 데이터 수집 실패: %s", self.stock_code, e)
             self.daily_data = pd.DataFrame()
+            return
+        self.save_cache()
     
     def resample_to_week(self, df):
         resampled_data = {
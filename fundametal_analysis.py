@@ -1,10 +1,14 @@
 from datetime import datetime, timedelta
 import pandas as pd
+import numpy as np
 
 from urllib.request import urlopen, Request
 from bs4 import BeautifulSoup
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import math
+import logging
 from io import StringIO
 
 # 재무 분석에 사용할 주요 지표 3개
@@ -23,6 +27,16 @@ from io import StringIO
 # 배당수익률 (Dividend Yield): 주당 배당금을 현재 주가로 나눈 값입니다. 높은 배당수익률은 주가 대비 좋은 배당수익을 제공하며, 이는 기업이 저평가되었을 가능성이 있음을 나타낼 수 있습니다. 특히, 안정적인 배당을 지속적으로 제공하는 기업의 경우 더욱 그렇습니다.
 
 
+logger = logging.getLogger(__name__)
+
+# FnGuide 요청은 하나의 세션으로 keep-alive 연결을 재사용
+FNGUIDE_HEADERS = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/39.0.2171.95 Safari/537.36'}
+fnguide_session = requests.Session()
+fnguide_session.headers.update(FNGUIDE_HEADERS)
+fnguide_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16,
+                                              max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])))
+
+
 class FundamentalAnalysis(object):
     def __init__(self, ticker):
         self.current_eps = 0
@@ -36,6 +50,7 @@ class FundamentalAnalysis(object):
         self.df = None
         self.table_token = None
         self.soup = None
+        self.data_tables = {}
         self.get_data_from_fnguide(ticker)
     
 
@@ -43,8 +58,7 @@ class FundamentalAnalysis(object):
         try:
             url = f'https://comp.fnguide.com/SVO2/ASP/SVD_Main.asp?pGB=1&gicode=A{ticker}&cID=&MenuYn=Y&ReportGB=&NewMenuID=11&stkGb=701'
                     #req.add_header('User-Agent', 'Mozilla/5.0')
-            headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/39.0.2171.95 Safari/537.36'}
-            res = requests.get(url, headers=headers)
+            res = fnguide_session.get(url)
             self.soup = BeautifulSoup(res.text, 'html.parser')
 
             cop = self.soup.select_one('#highlight_D_A')
@@ -55,6 +69,7 @@ class FundamentalAnalysis(object):
                 cop = self.soup.select_one('#highlight_B_A')
                 self.df = pd.read_html(StringIO(cop.prettify()))[0]
                 self.table_token = self.df.columns[0][0]
+                self.data_tables = {}
 
         except Exception as e:
             self.table_token = None
@@ -72,28 +87,30 @@ class FundamentalAnalysis(object):
         except ValueError:
             return None
 
+    # Annual / Net Quarter 표를 한번만 파싱해서 {항목: [값, ...]} 형태로 캐시
+    def get_data_table(self, target_cloumn):
+        if target_cloumn not in self.data_tables:
+            field_names = self.df[self.table_token][self.table_token]
+            data = self.df[target_cloumn]
+
+            # 숫자로 변환 안되는 값은 NaN으로 만든 뒤 결측값과 함께 제거
+            values = data.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+            table = {}
+            for row_name, row in zip(field_names, values):
+                if row_name in table:
+                    continue
+                table[row_name] = row[~np.isnan(row)].tolist()
+            self.data_tables[target_cloumn] = table
+        return self.data_tables[target_cloumn]
+
     def get_data_lst_by(self, target_cloumn, target_row):
         try:
             if self.table_token == None:
                 return None
-            field_names = self.df[self.table_token]
-            df = self.df.loc[field_names[self.table_token]==target_row]
-            #print(df)
-            data = df[target_cloumn]
-
-            # 특정 열에서 추정치 제거
-            # data = data[[col for col in data.columns if '(' not in col]]
-
-            #특정 열에서 결측값 제거
-            filtered_data = data.dropna(axis=1)
-            filtered_list = []
-            for x in filtered_data.iloc[0].tolist():
-                converted_x = self.safe_float_convert(x)
-                if converted_x != None:
-                    filtered_list.append(converted_x)
-            return filtered_list
-        except Exception as e:
-            print("Error : ", e)   
+            return self.get_data_table(target_cloumn)[target_row]
+        except (KeyError, IndexError) as e:
+            logger.debug("%s / %s 데이터 없음: %r", target_cloumn, target_row, e)
             return None
 
     # 업종에서 정보 가져오기    
@@ -144,7 +161,7 @@ class FundamentalAnalysis(object):
             return 0
 
         # print(dte_annual_lst)
-        print(dte_quater_lst)
+        logger.debug("분기 부채비율: %s", dte_quater_lst)
         # print(om_annual_lst)
         # print(om_quater_lst)
         # print("roe annual list :", roe_annual_lst)
@@ -2,24 +2,46 @@ import pandas as pd
 import FinanceDataReader as fdr
 import fundametal_analysis
 from datetime import datetime, timedelta
-from data_handler import StockDataHandler
+from data_handler import StockDataHandler, write_parquet_atomic
 import csv
-from rank_tickers import rank_calculate, bollinger_techniques2
+import os
+import glob
+import logging
+from rank_tickers import rank_calculate, bollinger_techniques2, save_sorted_df, get_last_total_df
+
+logger = logging.getLogger(__name__)
 
 def get_tickers():
+    # 종목 목록은 하루 한번만 받아서 parquet으로 캐시
+    cache_path = os.path.join('cache', 'krx_tickers_' + datetime.now().strftime('%Y%m%d') + '.parquet')
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception as e:
+            # 깨진 캐시 파일이면 새로 받음
+            logger.warning("종목 목록 캐시 읽기 실패: %s", e)
+
     #df_krx = stock.get_market_ticker_list('240818',market='ALL')
     df_krx = fdr.StockListing('KRX')
+    try:
+        os.makedirs('cache', exist_ok=True)
+        # 지난 날짜의 종목 목록 캐시는 다시 읽히지 않으므로 삭제
+        for old_path in glob.glob(os.path.join('cache', 'krx_tickers_*.parquet')):
+            if old_path != cache_path:
+                os.remove(old_path)
+        write_parquet_atomic(df_krx, cache_path)
+    except Exception as e:
+        logger.warning("종목 목록 캐시 저장 실패: %s", e)
     with open('tickers.csv','w') as file :
         write = csv.writer(file)
         write.writerow(df_krx)
     return df_krx
 
 
-# 행 추가 함수 정의
-def add_row(df, code, name, roe, pm, ey):
-    new_row = pd.DataFrame({'Code': code, 'Name': name, 'ROE': roe, 'PM': pm, 'EY': ey}, index=[0])
-    comb = pd.concat([df, new_row])
-    return comb
+# 수집한 (code, name, roe, pm, ey) 튜플 목록으로 한번에 DataFrame 생성
+def build_total_df(rows):
+    total_df = pd.DataFrame.from_records(rows, columns=['Code', 'Name', 'ROE', 'PM', 'EY'])
+    return total_df.astype({'ROE': 'float32', 'PM': 'float32', 'EY': 'float32'})
 
 #ROE : 자본이익률
 #PM : 이익수익률
@@ -50,7 +72,7 @@ def save_list_to_csv(result_list, filename):
 def main():
     # df_krx = get_tickers()
     # start, end = get_period()
-    # total_df = pd.DataFrame(columns=['Code', 'Name', 'ROE', 'PM', 'EY'])
+    # rows = []
     # print(len(df_krx))
     # for code, name in zip(df_krx['Code'], df_krx['Name']) :
     #     try:
@@ -60,15 +82,15 @@ def main():
     #             continue 
     #         daily_df = data_handler.get_daily_data()
     #         roe, pm, ey = get_magic_symbols(code, daily_df['trade_price'].iloc[-1])
-    #         total_df = add_row(total_df, code, name, roe, pm, ey)
+    #         rows.append((code, name, roe, pm, ey))
     #     except Exception as e:    
     #         print("raise error ", e)
             
-            
+    # total_df = build_total_df(rows)
     # df_sorted = rank_calculate(total_df)
-    # df_sorted.to_csv('df_sorted.csv', sep='\t', encoding='utf-8')
+    # save_sorted_df(df_sorted)
     
-    df_sorted = pd.read_csv('df_sorted.csv', sep='\t', encoding='utf-8')
+    df_sorted = get_last_total_df()
     print(df_sorted)
     result_list = bollinger_techniques2(df_sorted)
     
@@ -79,10 +101,11 @@ def main():
     # # 현재 날짜 출력
     # print('result ---- ')
     # current_date = datetime.now().strftime("%Y-%m-%d")
-    # filename = "total_df_" + current_date+ ".csv"
+    # filename = "total_df_" + current_date+ ".parquet"
     # print(filename)
-    # total_df.to_csv(filename, sep='\t', encoding='utf-8')
+    # total_df.to_parquet(filename, engine='pyarrow', compression='snappy', index=False)
 
 if __name__ == "__main__":
     # execute only if run as a script
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
     main()
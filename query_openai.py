@@ -1,7 +1,38 @@
-from openai import OpenAI
+from datetime import datetime, timedelta
+from itertools import islice
+import json
+import logging
 
-def dataframe_to_text(df):
-    return df.to_string(index=False)
+# openai 패키지가 없어도 모듈은 import 되도록 하고, 실제 호출 시점에 에러 처리
+try:
+    from openai import OpenAI
+except ImportError:
+    OpenAI = None
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "너는 경험 많은 주식 애널리스트야. 고객에게 시장 분석과 투자 전략을 제공하되, 데이터 기반 근거를 제시하고, 구체적인 수치나 통계를 포함해. 고객의 수준에 맞춘 설명을 하고, 불필요한 정보는 배제해. 최신 금융 트렌드를 반영해 대답하도록 해."
+
+# 호출마다 새 연결을 만들지 않도록 클라이언트는 한번만 생성해서 재사용
+_client = None
+
+def _get_client():
+    global _client
+    if _client is None:
+        if OpenAI is None:
+            raise ImportError("openai 패키지가 설치되어 있지 않습니다.")
+        _client = OpenAI()
+    return _client
+
+PROMPT_COLUMNS = ['open_price', 'high_price', 'low_price', 'trade_price', 'volume']
+
+# 고정폭 정렬 공백 없이 csv로 변환해서 프롬프트 토큰을 줄임
+# 최근 rows개 봉과 날짜(index), OHLCV 컬럼만 전달
+def dataframe_to_text(df, rows=8):
+    columns = [col for col in PROMPT_COLUMNS if col in df.columns]
+    if columns:
+        df = df[columns]
+    return df.tail(rows).to_csv(lineterminator='\n', float_format='%.10g')
 
 def ask_openai_with_dataframe(prompt, df):
     try:
@@ -11,36 +42,97 @@ def ask_openai_with_dataframe(prompt, df):
         # 데이터프레임을 포함한 프롬프트 구성
         full_prompt = f"{prompt}\n\nHere is the relevant data:\n{df_text}\n\n"
         
-        client = OpenAI()
+        client = _get_client()
 
         # OpenAI API로 요청 보내기
-        # print('create')
-        # response = client.Completion.create(
-        #     engine="gpt-4o-mini",
-        #     prompt=full_prompt,  # 사용자 질의 + 데이터프레임 텍스트
-        #     temperature=0.7  # 출력의 다양성 정도
-        # )
-        
-        completion = client.chat.completions.create(
+        stream = client.chat.completions.create(
         model="gpt-4o-mini",
+        stream=True,
         messages=[
-                {"role": "system", "content": "너는 경험 많은 주식 애널리스트야. 고객에게 시장 분석과 투자 전략을 제공하되, 데이터 기반 근거를 제시하고, 구체적인 수치나 통계를 포함해. 고객의 수준에 맞춘 설명을 하고, 불필요한 정보는 배제해. 최신 금융 트렌드를 반영해 대답하도록 해."},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {
                     "role": "user",
                     "content": full_prompt,
                 }
             ]
         )
-        print(completion.choices[0].message)
 
-        # # 응답 텍스트 반환
-        # print(response.choices[0].text.strip())
-        # return response.choices[0].text.strip()
+        # 응답이 생성되는 대로 바로 출력
+        answer = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                answer.append(delta)
+                print(delta, end='', flush=True)
+        print()
+        return ''.join(answer)
 
     except Exception as e:
         return f"Error: {str(e)}"
 
+# 여러 종목을 하나의 프롬프트로 묶어서 요청 횟수를 줄임
+# code_dfs: [(code, df), ...], 결과: {code: {'prob': .., 'explanation': ..}}
+def ask_openai_batched(prompt, code_dfs, batch_size=15):
+    client = _get_client()
+    results = {}
+    it = iter(code_dfs)
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            break
+
+        blocks = []
+        for idx, (code, df) in enumerate(batch, start=1):
+            blocks.append(f"### [{idx}] code={code}\n{dataframe_to_text(df)}")
+        full_prompt = (f"{prompt}\n\n"
+                       "각 종목에 대해 다른 설명 없이 JSON 배열로만 답해줘. "
+                       '예: [{"idx": 1, "prob": 72, "explanation": "..."}]\n\n'
+                       + "\n\n".join(blocks))
+
+        try:
+            completion = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": full_prompt},
+                ]
+            )
+            answer = completion.choices[0].message.content.strip()
+            # ```json ... ``` 형태로 감싸서 오는 경우 제거
+            answer = answer.strip('`').removeprefix('json').strip()
+            items = json.loads(answer)
+        except Exception as e:
+            logger.warning("배치 요청 실패: %s", e)
+            continue
+
+        # 종목이 하나면 배열 대신 객체 하나로 답하는 경우가 있음
+        if isinstance(items, dict):
+            items = [items]
+        if not isinstance(items, list):
+            logger.warning("JSON 배열이 아닌 응답: %s", items)
+            continue
+
+        # idx가 범위를 벗어나거나 잘못된 항목은 건너뛰고 나머지는 그대로 반영
+        for item in items:
+            try:
+                idx = int(item['idx'])
+            except (KeyError, TypeError, ValueError, OverflowError):
+                logger.warning("잘못된 응답 항목: %s", item)
+                continue
+            if not 1 <= idx <= len(batch):
+                logger.warning("idx 범위 초과: %s (1~%d)", idx, len(batch))
+                continue
+            code = batch[idx - 1][0]
+            results[code] = {'prob': item.get('prob'), 'explanation': item.get('explanation')}
+
+    return results
+
 def check_gpt(code):
+    # pykrx/pandas 로딩 비용은 check_gpt를 쓸 때만 지불
+    from data_handler import StockDataHandler
+
     code = '101000'
     current_date = datetime.now()
     result_date = current_date - timedelta(days=30)
@@ -56,6 +148,4 @@ def check_gpt(code):
     #query = "9월 23일에 거래량과 일봉 캔들 패턴을 바탕으로 70%이상 상승할것이라고 예측했는데 9월 26일자 기준으로 보면 하락했어. 차트를 기준으로 원인을 분석해줘. 그리고 9월 23일자 기준으로 과매수였나? 과매수였다는것은 어떻게 판단해? 상승중 거래량이 감소했나?"
     
     print('ask openai')
-    ask_openai_with_dataframe(query, daily_df)
-    
-    daily_df.to_string(index=False)
\ No newline at end of file
+    ask_openai_with_dataframe(query, daily_df)
\ No newline at end of file
@@ -1,14 +1,33 @@
 import pandas as pd
+import numpy as np
+import os
+import time
+import logging
+from functools import lru_cache
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from data_handler import StockDataHandler
 
 from technical_analysis import bolin_check2
 
+logger = logging.getLogger(__name__)
+
+# 내림차순 등수 (동점은 가장 낮은 등수, NaN은 NaN) - Series.rank(ascending=False, method='min')과 동일
+def rank_desc(values):
+    a = np.asarray(values, dtype=float)
+    valid = ~np.isnan(a)
+    sorted_values = np.sort(a[valid])
+    ranks = np.full(len(a), np.nan)
+    # 자기보다 큰 값의 개수 + 1
+    ranks[valid] = len(sorted_values) - np.searchsorted(sorted_values, a[valid], side='right') + 1
+    return ranks
+
 def rank_calculate(df):
-    df['ROE_Rank'] = df['ROE'].rank(ascending=False, method='min')
+    df['ROE_Rank'] = rank_desc(df['ROE'])
 
     # PM 기준으로 등수 매기기
-    df['PM_Rank'] = df['PM'].rank(ascending=False, method='min')
+    df['PM_Rank'] = rank_desc(df['PM'])
     #df['EY_Rank'] = df['EY'].rank(ascending=False, method='min')
 
     # 두 등수의 합산 등수 매기기
@@ -29,46 +48,70 @@ def get_period():
     start_date = result_date.strftime('%Y-%m-%d')
     return start_date, end_date
 
-def bollinger_techniques2(df):
-    count = 0
+# 종목 하나를 검사해서 조건에 맞으면 (code, name), 아니면 None 반환
+def bollinger_check_one(code, name, start, end):
+    try:
+        formatted_number = str(code).zfill(6)
+        data_handler = StockDataHandler(formatted_number, start, end)
+        if data_handler.check_valid_data() == False:
+            return None
+
+        daily_df = data_handler.get_daily_data()
+        if bolin_check2(daily_df):
+            logger.debug("조건 충족: %s", formatted_number)
+            return (code, name)
+    except Exception as e:
+        logger.warning("%s 검사 실패: %s", code, e)
+    return None
+
+def bollinger_techniques2(df, max_workers=8):
+    # 상위 501개 종목만 검사, 데이터 수집(I/O)이 대부분이라 스레드로 병렬 처리
+    head = df.iloc[:501]
+    codes = list(head['Code'])
+    names = list(head['Name'])
+    start, end = get_period()
+
     result_list = []  # 결과를 담을 리스트 선언
-    for code, name in zip(df['Code'], df['Name']) :
-        try:
-            if count > 500 :
-                return 
-            
-            count = count + 1
-            #print(code, count)
-            start, end = get_period()
-            formatted_number = str(code).zfill(6)
-            print(formatted_number)
-            data_handler = StockDataHandler(formatted_number, start, end)
-            if data_handler.check_valid_data() == False:
-                continue 
-            
-            daily_df = data_handler.get_daily_data()
-            if bolin_check2(daily_df):
-                print('wow:' + code)
-                result_list.append(code)  
-        
-        except Exception as e:    
-            print("raise error ", e)
-            count = count + 1
-            
-    print(result_list)
+    last_log = 0.0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(bollinger_check_one, codes, names, repeat(start), repeat(end))
+        for count, result in enumerate(results, start=1):
+            # 종목마다 출력하지 않고 1초에 한번만 진행상황 기록
+            now = time.monotonic()
+            if now - last_log >= 1.0:
+                logger.info("진행 %d/%d", count, len(codes))
+                last_log = now
+            if result is not None:
+                result_list.append(result)
+
+    logger.info("조건 충족 %d건: %s", len(result_list), result_list)
             
     return result_list
 
 
-def get_last_total_df():
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    filename = "df_sorted.csv"
-    print(filename)
-    df = pd.read_csv(filename, sep='\t', encoding='utf-8')
+# 단계 간 전달은 parquet으로, 사람이 보는 용도로 csv도 함께 저장
+def save_sorted_df(df_sorted):
+    df_sorted.to_parquet('df_sorted.parquet', engine='pyarrow', compression='snappy', index=False)
+    df_sorted.to_csv('df_sorted.csv', sep='\t', encoding='utf-8')
+    _read_sorted_df.cache_clear()
+
+# df_sorted 파일은 한번만 읽고 이후에는 캐시된 결과를 사용
+@lru_cache(maxsize=1)
+def _read_sorted_df():
+    if os.path.exists('df_sorted.parquet'):
+        return pd.read_parquet('df_sorted.parquet')
+    # pyarrow 엔진은 여러 코어로 나눠서 파싱
+    df = pd.read_csv('df_sorted.csv', sep='\t', encoding='utf-8', engine='pyarrow', dtype={'Code': str, 'Name': str})
+    df['Code'] = df['Code'].str.zfill(6)
     return df
 
+def get_last_total_df():
+    # rank_calculate 등이 컬럼을 추가하므로 캐시 원본 대신 복사본을 반환
+    return _read_sorted_df().copy()
+
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
     current_date = datetime.now().strftime("%Y-%m-%d")
     df = get_last_total_df()
     
@@ -3,52 +3,89 @@
 # %b가 0.8 MFi(10) 80보다 커야 한다.
 import pandas as pd
 import numpy as np
+import logging
 
+logger = logging.getLogger(__name__)
 
-# 볼린저 밴드와 %b 계산
+
+# 볼린저 밴드와 %b 계산 (컬럼은 한번에 추가)
 def calculate_bollinger_bands(df, window=20):
-    df['MA'] = df['trade_price'].rolling(window).mean()
-    df['STD'] = df['trade_price'].rolling(window).std()
-    df['Upper_Band'] = df['MA'] + (df['STD'] * 2)
-    df['Lower_Band'] = df['MA'] - (df['STD'] * 2)
-    df['%b'] = (df['trade_price'] - df['Lower_Band']) / (df['Upper_Band'] - df['Lower_Band'])
-    return df
+    close = df['trade_price']
+    ma = close.rolling(window).mean()
+    std = close.rolling(window).std()
+    upper_band = ma + (std * 2)
+    lower_band = ma - (std * 2)
+    percent_b = (close - lower_band) / (upper_band - lower_band)
+    return df.assign(**{'MA': ma, 'STD': std, 'Upper_Band': upper_band, 'Lower_Band': lower_band, '%b': percent_b})
 
 # MFI(10) 계산
 def calculate_mfi(df, window=10):
-    # Typical Price
-    df['Typical_Price'] = (df['high_price'] + df['low_price'] + df['trade_price']) / 3
+    high = df['high_price'].to_numpy(dtype=float)
+    low = df['low_price'].to_numpy(dtype=float)
+    close = df['trade_price'].to_numpy(dtype=float)
+    volume = df['volume'].to_numpy(dtype=float)
+
+    # Typical Price, Raw Money Flow
+    typical_price = (high + low + close) / 3
+    raw_money_flow = typical_price * volume
+
+    # Positive and Negative Money Flow (첫날은 비교 대상이 없으므로 0)
+    diff = np.diff(typical_price, prepend=np.nan)
+    positive_flow = np.where(diff > 0, raw_money_flow, 0.0)
+    negative_flow = np.where(diff < 0, raw_money_flow, 0.0)
+
+    # window 구간 합 (앞의 window-1개는 NaN)
+    kernel = np.ones(window)
+    positive_sum = np.full(len(close), np.nan)
+    negative_sum = np.full(len(close), np.nan)
+    if len(close) >= window:
+        positive_sum[window - 1:] = np.convolve(positive_flow, kernel, 'valid')
+        negative_sum[window - 1:] = np.convolve(negative_flow, kernel, 'valid')
 
-    # Raw Money Flow
-    df['Raw_Money_Flow'] = df['Typical_Price'] * df['volume']
+    # Money Flow Ratio, MFI
+    with np.errstate(divide='ignore', invalid='ignore'):
+        money_flow_ratio = positive_sum / negative_sum
+        mfi = 100 - (100 / (1 + money_flow_ratio))
 
-    # Positive and Negative Money Flow
-    df['Positive_Flow'] = np.where(df['Typical_Price'] > df['Typical_Price'].shift(1), df['Raw_Money_Flow'], 0)
-    df['Negative_Flow'] = np.where(df['Typical_Price'] < df['Typical_Price'].shift(1), df['Raw_Money_Flow'], 0)
+    return pd.Series(mfi, index=df.index, name='MFI')
 
-    # Money Flow Ratio
-    df['Money_Flow_Ratio'] = df['Positive_Flow'].rolling(window).sum() / df['Negative_Flow'].rolling(window).sum()
+# 마지막 봉의 %b만 계산 (최근 window개 종가만 사용)
+def calculate_last_percent_b(df, window=20):
+    close = df['trade_price'].to_numpy(dtype=float)
+    if len(close) < window:
+        return np.nan
+    recent = close[-window:]
+    ma = recent.mean()
+    std = recent.std(ddof=1)
+    upper_band = ma + (std * 2)
+    lower_band = ma - (std * 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (close[-1] - lower_band) / (upper_band - lower_band)
 
-    # MFI
-    df['MFI'] = 100 - (100 / (1 + df['Money_Flow_Ratio']))
+# 마지막 봉의 MFI만 계산 (최근 window+1개 봉만 사용)
+def calculate_last_mfi(df, window=10):
+    if len(df) < window:
+        return np.nan
+    recent = df.iloc[-(window + 1):]
+    typical_price = (recent['high_price'].to_numpy(dtype=float) + recent['low_price'].to_numpy(dtype=float)
+                     + recent['trade_price'].to_numpy(dtype=float)) / 3
+    raw_money_flow = typical_price * recent['volume'].to_numpy(dtype=float)
 
-    return df
+    diff = np.diff(typical_price, prepend=np.nan)[-window:]
+    raw_money_flow = raw_money_flow[-window:]
+    positive_sum = raw_money_flow[diff > 0].sum()
+    negative_sum = raw_money_flow[diff < 0].sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        money_flow_ratio = np.float64(positive_sum) / negative_sum
+        return 100 - (100 / (1 + money_flow_ratio))
 
 def bolin_check2(df) :
-    # 볼린저 밴드 및 %b 계산
-    df = calculate_bollinger_bands(df)
-    
-    # MFI 계산
-    df = calculate_mfi(df)
+    # 마지막 봉의 %b, MFI만 필요하므로 전체 구간은 계산하지 않음
+    percent_b = calculate_last_percent_b(df)
+    mfi = calculate_last_mfi(df)
 
     # %b > 0.8 and MFI > 80 필터링
-    print(df['%b'].iloc[-1], df['MFI'].iloc[-1])
-    if (df['%b'].iloc[-1] > 0.75) and (df['MFI'].iloc[-1] > 80) :
-        print('wow')
+    logger.debug("%%b=%s MFI=%s", percent_b, mfi)
+    if (percent_b > 0.75) and (mfi > 80) :
         return True
     return False
-
-
-
-    
-    
\ No newline at end of file